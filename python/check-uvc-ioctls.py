@@ -1,14 +1,17 @@
 #!/usr/bin/env python3
 import os
 import subprocess
+import sys
 
-def get_ioctl_value(name):
+def get_ioctl_values(names):
+    # Print every value from one program so gcc only runs once
+    printfs = "\n".join(f'        printf("0x%08x\\n", {name});' for name in names)
     c_code = f"""
     #include <linux/videodev2.h>
     #include <linux/usb/g_uvc.h>
     #include <stdio.h>
     int main() {{
-        printf("0x%08x\\n", {name});
+{printfs}
         return 0;
     }}
     """
@@ -21,9 +24,12 @@ def get_ioctl_value(name):
     try:
         subprocess.run(['gcc', '/tmp/check_ioctl.c', '-o', '/tmp/check_ioctl'])
         result = subprocess.run(['/tmp/check_ioctl'], capture_output=True, text=True)
-        return result.stdout.strip()
+        values = result.stdout.split()
+        if len(values) != len(names):
+            return [f"Error: {result.stderr.strip()}"] * len(names)
+        return values
     except Exception as e:
-        return f"Error: {e}"
+        return [f"Error: {e}"] * len(names)
     finally:
         # Cleanup
         if os.path.exists('/tmp/check_ioctl'):
@@ -31,11 +37,9 @@ def get_ioctl_value(name):
         if os.path.exists('/tmp/check_ioctl.c'):
             os.remove('/tmp/check_ioctl.c')
 
-print("Checking system IOCTL values...")
-print(f"VIDIOC_DQEVENT = {get_ioctl_value('VIDIOC_DQEVENT')}")
-print(f"VIDIOC_S_FMT = {get_ioctl_value('VIDIOC_S_FMT')}")
-print(f"VIDIOC_SUBSCRIBE_EVENT = {get_ioctl_value('VIDIOC_SUBSCRIBE_EVENT')}")
-print(f"UVCIOC_SEND_RESPONSE = {get_ioctl_value('UVCIOC_SEND_RESPONSE')}")
+IOCTL_NAMES = ['VIDIOC_DQEVENT', 'VIDIOC_S_FMT', 'VIDIOC_SUBSCRIBE_EVENT', 'UVCIOC_SEND_RESPONSE']
+
+values = get_ioctl_values(IOCTL_NAMES)
 
 # Let's also directly calculate it based on the macro from g_uvc.h
 # From g_uvc.h: #define UVCIOC_SEND_RESPONSE      _IOW('U', 1, struct uvc_request_data)
@@ -52,4 +56,7 @@ def _IOW(type, nr, size):
 # Calculate size of uvc_request_data (length:int32 + data:uint8[60])
 size = struct.calcsize('i60B')  # 4 + 60 = 64 bytes
 calculated_code = _IOW('U', 1, size)
-print(f"\nCalculated UVCIOC_SEND_RESPONSE = 0x{calculated_code:08x}")
+
+sys.stdout.write("Checking system IOCTL values...\n" +
+                 "".join(f"{name} = {value}\n" for name, value in zip(IOCTL_NAMES, values)) +
+                 f"\nCalculated UVCIOC_SEND_RESPONSE = 0x{calculated_code:08x}\n")
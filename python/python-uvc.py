@@ -5,29 +5,53 @@ import os
 import time
 import select
 import errno
+import logging
+import logging.handlers
+import queue
+import threading
 import sys
 from ctypes import (
     Structure, Union, POINTER,
     c_uint8, c_uint16, c_uint32, c_uint64,
     c_int8, c_int16, c_int32, c_int64,
     c_char, c_char_p, c_void_p, c_size_t,
-    c_ulong, c_long, sizeof, addressof, memmove, byref
+    c_ulong, c_long, sizeof, addressof, memmove, byref,
+    CDLL, get_errno
 )
 import mmap
 
-# IOCTL codes
-VIDIOC_QUERYCAP = 0x80685600
-VIDIOC_G_FMT = 0xc0d05604
-VIDIOC_S_FMT = 0xc0cc5605
-VIDIOC_REQBUFS = 0xc0145608
-VIDIOC_QUERYBUF = 0xc0445609
-VIDIOC_QBUF = 0xc044560f
-VIDIOC_DQBUF = 0xc0445611
-VIDIOC_STREAMON = 0x40045612
-VIDIOC_STREAMOFF = 0x40045613
-VIDIOC_SUBSCRIBE_EVENT = 0x4020565a
-VIDIOC_DQEVENT = 0x80805659
-UVCIOC_SEND_RESPONSE = 0x40405501
+log = logging.getLogger("uvc")
+
+# IOCTL codes, encoded as in <asm-generic/ioctl.h>. Argument sizes are the
+# kernel struct sizes on the 32-bit ARM gadget boards (check-uvc-ioctls.py
+# prints the values for the running system).
+_IOC_WRITE = 1
+_IOC_READ = 2
+
+def _IOC(direction, type, nr, size):
+    return (direction << 30) | (size << 16) | (ord(type) << 8) | nr
+
+def _IOR(type, nr, size):
+    return _IOC(_IOC_READ, type, nr, size)
+
+def _IOW(type, nr, size):
+    return _IOC(_IOC_WRITE, type, nr, size)
+
+def _IOWR(type, nr, size):
+    return _IOC(_IOC_READ | _IOC_WRITE, type, nr, size)
+
+VIDIOC_QUERYCAP = _IOR('V', 0, 104)          # struct v4l2_capability
+VIDIOC_G_FMT = _IOWR('V', 4, 204)            # struct v4l2_format
+VIDIOC_S_FMT = _IOWR('V', 5, 204)            # struct v4l2_format
+VIDIOC_REQBUFS = _IOWR('V', 8, 20)           # struct v4l2_requestbuffers
+VIDIOC_QUERYBUF = _IOWR('V', 9, 68)          # struct v4l2_buffer
+VIDIOC_QBUF = _IOWR('V', 15, 68)             # struct v4l2_buffer
+VIDIOC_DQBUF = _IOWR('V', 17, 68)            # struct v4l2_buffer
+VIDIOC_STREAMON = _IOW('V', 18, 4)           # int
+VIDIOC_STREAMOFF = _IOW('V', 19, 4)          # int
+VIDIOC_SUBSCRIBE_EVENT = _IOW('V', 90, 32)   # struct v4l2_event_subscription
+VIDIOC_DQEVENT = _IOR('V', 89, 128)          # struct v4l2_event
+UVCIOC_SEND_RESPONSE = _IOW('U', 1, 64)      # struct uvc_request_data
 
 # UVC event types
 V4L2_EVENT_PRIVATE_START = 0x08000000
@@ -77,6 +101,9 @@ V4L2_BUF_TYPE_VBI_OUTPUT = 5
 V4L2_BUF_TYPE_SLICED_VBI_CAPTURE = 6
 V4L2_BUF_TYPE_SLICED_VBI_OUTPUT = 7
 
+# STREAMON/STREAMOFF argument, shared by every call
+BUF_TYPE_OUTPUT = c_int32(V4L2_BUF_TYPE_VIDEO_OUTPUT)
+
 # V4L2 colorspace constants
 V4L2_COLORSPACE_DEFAULT = 0
 V4L2_COLORSPACE_SMPTE170M = 1
@@ -109,10 +136,32 @@ V4L2_QUANTIZATION_DEFAULT = 0
 V4L2_QUANTIZATION_FULL_RANGE = 1
 V4L2_QUANTIZATION_LIM_RANGE = 2
 
+# SCHED_FIFO priority for the streaming thread
+STREAMING_THREAD_PRIORITY = 50
+
+# mlockall() flags and prctl() option from <sys/mman.h> / <linux/prctl.h>
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+# Stack size for every thread; the default 8 MiB would be locked in full
+THREAD_STACK_SIZE = 256 * 1024
+PR_SET_NAME = 15
+
+libc = CDLL(None, use_errno=True)
+
+# How often stats_thread() reports the frame rate
+STATS_INTERVAL_NS = 1000000000
+
+# Animation steps in the test pattern, one pre-filled buffer per step
+TEST_PATTERN_STEPS = 8
+
 # Add these color constants at the top with other constants
 WHITE = 0x80eb80eb
 GRAY = 0x807F7F7F
 
+# Byte images of the colors as they are laid out in a YUYV frame
+WHITE_LE = WHITE.to_bytes(4, byteorder='little')
+GRAY_LE = GRAY.to_bytes(4, byteorder='little')
+
 # Add these constants at the top with your other constants
 UVC_RC_UNDEFINED = 0x00
 UVC_SET_CUR = 0x01
@@ -167,6 +216,12 @@ class usb_ctrlrequest(Structure):
                 f"wIndex: 0x{self.wIndex:04x}\n"
                 f"wLength: {self.wLength}")
 
+# Wire layout of usb_ctrlrequest, for parsing setup packets without
+# building a Structure per event
+USB_CTRLREQUEST_STRUCT = struct.Struct('<BBHHH')
+# Signed length field at the start of the kernel's uvc_request_data
+REQUEST_LENGTH_STRUCT = struct.Struct('<i')
+
 class uvc_request_data(Structure):
     _fields_ = [
         ('length', c_int32),
@@ -194,6 +249,10 @@ class uvc_streaming_control(Structure):
         ('bMaxVersion', c_uint8),
     ]
 
+SIZEOF_UVC_STREAMING_CONTROL = sizeof(uvc_streaming_control)
+# UVC 1.0 controls end after dwMaxPayloadTransferSize
+UVC10_STREAMING_CONTROL_SIZE = 26
+
 class uvc_event(Union):
     _fields_ = [
         ('req', usb_ctrlrequest),
@@ -310,10 +369,26 @@ class DeviceState:
     def __init__(self):
         self.probe_control = uvc_streaming_control()
         self.commit_control = uvc_streaming_control()
+        # The control structs live as long as the state, so their addresses
+        # can be taken once for memmove()
+        self.probe_addr = addressof(self.probe_control)
+        self.commit_addr = addressof(self.commit_control)
         self.current_control = None
+        # Reused for every control response. Events are handled one at a
+        # time and each response is sent before the next DQEVENT.
+        self.response = uvc_request_data()
         self.streaming = False
+        # Frames queued by the streaming thread, sampled by stats_thread()
+        self.frame_count = 0
         self.connected = False
         self.format_set = False
+        # Both set on STREAMOFF: the event wakes stats_thread(), the eventfd
+        # wakes the streaming thread out of its epoll wait
+        self.stop_event = threading.Event()
+        self.stop_fd = os.eventfd(0, os.EFD_CLOEXEC | os.EFD_NONBLOCK)
+        # Threads of the current stream, joined on STREAMOFF so a quick
+        # STREAMOFF/STREAMON cannot leave an old thread running
+        self.threads = []
 
 state = DeviceState()
 
@@ -329,77 +404,93 @@ def main():
     
     try:
         device_path = "/dev/video0"
-        print(f"Opening {device_path}")
-        fd = os.open(device_path, os.O_RDWR | os.O_NONBLOCK)
+        log.debug("Opening %s", device_path)
+        fd = os.open(device_path, os.O_RDWR | os.O_NONBLOCK | os.O_CLOEXEC)
+        
+        # Lock the whole process, including the stacks of threads started
+        # later (kept small by THREAD_STACK_SIZE), so the streaming thread
+        # does not stall on page faults. The frame buffers are driver memory
+        # prefaulted by MAP_POPULATE. Needs CAP_IPC_LOCK (or root);
+        # streaming works without it.
+        if libc.mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+            log.warning("Failed to lock memory: %s", os.strerror(get_errno()))
         
         # Query device capabilities
         cap = v4l2_capability()
-        print("#### Calling ioctl: VIDIOC_QUERYCAP\n");
         fcntl.ioctl(fd, VIDIOC_QUERYCAP, cap)
-        print(f"Capabilities: 0x{cap.capabilities:08x}")
+        log.debug("Capabilities: 0x%08x", cap.capabilities)
 
         # Set video format
         if set_video_format(fd) < 0:
-            print("Failed to set video format")
+            log.error("Failed to set video format")
             return
 
         # ✅ Initialize probe and commit control (Matches C `uvc_events_init`)
-        print("\n🔧 Initializing Streaming Control Defaults")
+        log.debug("🔧 Initializing Streaming Control Defaults")
         init_streaming_control(state.probe_control)
         init_streaming_control(state.commit_control)
         
         # Subscribe to all events
         if subscribe_events(fd) < 0:
-            print("Failed to subscribe to events")
+            log.error("Failed to subscribe to events")
             return
 
-        print("Device ready - waiting for events...")
+        log.info("Device ready - waiting for events...")
 
         epoll = select.epoll()
         epoll.register(fd, select.EPOLLPRI)
 
+        # DQEVENT overwrites the whole struct, so one instance serves every event
+        event = v4l2_event()
+        ioctl = fcntl.ioctl
+
         while True:
-            events = epoll.poll(1)  # 1-second timeout
-            for fd, event_mask in events:
-                print(f"\nReceived event with mask: 0x{event_mask:x}")
-                event = v4l2_event()
+            # fd is the only registration, so a wakeup always means its
+            # event queue has something pending
+            epoll.poll()
+            # Handle every queued event before waiting again. DQEVENT on
+            # the non-blocking fd fails with ENOENT once the queue is empty.
+            while True:
                 try:
-                    print("#### Calling ioctl: VIDIOC_DQEVENT\n");
-                    fcntl.ioctl(fd, VIDIOC_DQEVENT, event)
-                    print(f"Event type: 0x{event.type:08x}")
-                    handler = EVENT_HANDLERS.get(event.type)
+                    ioctl(fd, VIDIOC_DQEVENT, event)
+                except OSError as e:
+                    if e.errno not in (errno.ENOENT, errno.EAGAIN):
+                        log.error("Error dequeuing event: %s", e)
+                    break
+                try:
+                    log.debug("Event type: 0x%08x", event.type)
+                    index = event.type - V4L2_EVENT_PRIVATE_START
+                    handler = EVENT_HANDLERS[index] if 0 <= index < len(EVENT_HANDLERS) else None
                     if handler:
-                        print(f"Found handler for event type 0x{event.type:08x}")
+                        log.debug("Found handler for event type 0x%08x", event.type)
                         response = handler(event)
                         if response:
-                            print("Got response, sending...")
+                            log.debug("Got response, sending...")
 
                             #Log the response before sending
-                            print(f"resp.length: {response.length}")
+                            log.debug("resp.length: %s", response.length)
 
-                            print("resp.data (first 16 bytes): ", end="")
-                            for i in range(min(16, response.length)):
-                                print(f"{response.data[i]:02x} ", end="")
+                            if log.isEnabledFor(logging.DEBUG):
+                                log.debug("resp.data (first 16 bytes): %s",
+                                          bytes(response.data[:max(0, min(16, response.length))]).hex(' '))
 
-                            print("#### Calling ioctl: UVCIOC_SEND_RESPONSE\n");
-                            fcntl.ioctl(fd, UVCIOC_SEND_RESPONSE, response)
+                            ioctl(fd, UVCIOC_SEND_RESPONSE, response)
                         else:
-                            print("Handler returned no response")
+                            log.debug("Handler returned no response")
                     else:
-                        print(f"Unhandled event type: 0x{event.type:08x}")
+                        log.warning("Unhandled event type: 0x%08x", event.type)
                 except Exception as e:
-                    print(f"Error handling event: {e}")
-            
-            time.sleep(0.01)  # Prevent busy-waiting
+                    log.error("Error handling event: %s", e)
 
     except KeyboardInterrupt:
-        print("\nExiting...")
+        log.debug("Exiting...")
     finally:
         if buffers:
             for buf in buffers:
+                buf['view'].release()
                 buf['mmap'].close()
         if fd is not None:
-            print("Device closed")
+            log.debug("Device closed")
             os.close(fd)
 
 def uvc_request_name(req):
@@ -436,37 +527,59 @@ def init_streaming_control(ctrl, width=640, height=360, fps=30, mode='default'):
     ctrl.bMinVersion = 1
     ctrl.bMaxVersion = 1
 
-    print(f"Initialized Streaming Control:")
-    print(f"  Frame size: {ctrl.dwMaxVideoFrameSize} bytes")
-    print(f"  Frame interval: {ctrl.dwFrameInterval} (100ns units)")
-    print(f"  Max payload size: {ctrl.dwMaxPayloadTransferSize}")
+    log.debug("Initialized Streaming Control:")
+    log.debug("  Frame size: %s bytes", ctrl.dwMaxVideoFrameSize)
+    log.debug("  Frame interval: %s (100ns units)", ctrl.dwFrameInterval)
+    log.debug("  Max payload size: %s", ctrl.dwMaxPayloadTransferSize)
 
 
+def streaming_control_bytes(mode='default'):
+    """Return the wire image of a freshly initialized streaming control"""
+    ctrl = uvc_streaming_control()
+    init_streaming_control(ctrl, mode=mode)
+    return bytes(ctrl)
+
+# GET_MIN/MAX/DEF/RES answers never change, so build them once
+PROBE_MIN_BYTES = streaming_control_bytes('min')
+PROBE_MAX_BYTES = streaming_control_bytes('max')
+PROBE_DEF_BYTES = streaming_control_bytes()
+
+# GET_INFO capabilities (GET/SET supported) and GET_LEN of a streaming control
+INFO_GET_SET_BYTES = bytes([0x03])
+STREAMING_CONTROL_LEN_BYTES = struct.pack('<H', SIZEOF_UVC_STREAMING_CONTROL)
+# Control interface reply: GET_INFO byte zero padded over the whole payload,
+# so any wLength reads zeros past it
+CONTROL_INTERFACE_BYTES = INFO_GET_SET_BYTES.ljust(len(uvc_request_data().data), b'\x00')
+
+def set_response(response, data):
+    """Copy a bytes-like payload into response.data and set its length"""
+    memoryview(response.data).cast('B')[:len(data)] = data
+    response.length = len(data)
 
 def log_streaming_control(ctrl, prefix=""):
     """Helper to log UVC streaming control parameters"""
-    print(f"\n{prefix} Streaming Control Details:")
-    print(f"  bmHint: 0x{ctrl.bmHint:04x}")
-    print(f"  bFormatIndex: {ctrl.bFormatIndex}")
-    print(f"  bFrameIndex: {ctrl.bFrameIndex}")
-    print(f"  dwFrameInterval: {ctrl.dwFrameInterval}")
-    print(f"  wKeyFrameRate: {ctrl.wKeyFrameRate}")
-    print(f"  wPFrameRate: {ctrl.wPFrameRate}")
-    print(f"  wCompQuality: {ctrl.wCompQuality}")
-    print(f"  wCompWindowSize: {ctrl.wCompWindowSize}")
-    print(f"  wDelay: {ctrl.wDelay}")
-    print(f"  dwMaxVideoFrameSize: {ctrl.dwMaxVideoFrameSize}")
-    print(f"  dwMaxPayloadTransferSize: {ctrl.dwMaxPayloadTransferSize}")
-    print(f"  dwClockFrequency: {ctrl.dwClockFrequency}")
-    print(f"  bmFramingInfo: 0x{ctrl.bmFramingInfo:02x}")
-    print(f"  bPreferredVersion: {ctrl.bPreferredVersion}")
-    print(f"  bMinVersion: {ctrl.bMinVersion}")
-    print(f"  bMaxVersion: {ctrl.bMaxVersion}")
+    log.debug("%s Streaming Control Details:", prefix)
+    log.debug("  bmHint: 0x%04x", ctrl.bmHint)
+    log.debug("  bFormatIndex: %s", ctrl.bFormatIndex)
+    log.debug("  bFrameIndex: %s", ctrl.bFrameIndex)
+    log.debug("  dwFrameInterval: %s", ctrl.dwFrameInterval)
+    log.debug("  wKeyFrameRate: %s", ctrl.wKeyFrameRate)
+    log.debug("  wPFrameRate: %s", ctrl.wPFrameRate)
+    log.debug("  wCompQuality: %s", ctrl.wCompQuality)
+    log.debug("  wCompWindowSize: %s", ctrl.wCompWindowSize)
+    log.debug("  wDelay: %s", ctrl.wDelay)
+    log.debug("  dwMaxVideoFrameSize: %s", ctrl.dwMaxVideoFrameSize)
+    log.debug("  dwMaxPayloadTransferSize: %s", ctrl.dwMaxPayloadTransferSize)
+    log.debug("  dwClockFrequency: %s", ctrl.dwClockFrequency)
+    log.debug("  bmFramingInfo: 0x%02x", ctrl.bmFramingInfo)
+    log.debug("  bPreferredVersion: %s", ctrl.bPreferredVersion)
+    log.debug("  bMinVersion: %s", ctrl.bMinVersion)
+    log.debug("  bMaxVersion: %s", ctrl.bMaxVersion)
 
     
 def set_video_format(fd):
     """Set video format to YUYV 640x360"""
-    print("\nSetting video format")
+    log.debug("Setting video format")
     global current_format
     
     fmt = v4l2_format()
@@ -483,477 +596,258 @@ def set_video_format(fd):
     fmt.fmt.pix.quantization = V4L2_QUANTIZATION_LIM_RANGE
     
     try:
-        print("#### Calling ioctl: VIDIOC_S_FMT\n");
         fcntl.ioctl(fd, VIDIOC_S_FMT, fmt)
-        print("Video format set successfully:")
-        print(f"  Width: {fmt.fmt.pix.width}")
-        print(f"  Height: {fmt.fmt.pix.height}")
-        print(f"  Pixel Format: {hex(fmt.fmt.pix.pixelformat)}")
-        print(f"  Bytes per line: {fmt.fmt.pix.bytesperline}")
-        print(f"  Size image: {fmt.fmt.pix.sizeimage}")
-        print(f"  Colorspace: {fmt.fmt.pix.colorspace}")
+        log.debug("Video format set successfully:")
+        log.debug("  Width: %s", fmt.fmt.pix.width)
+        log.debug("  Height: %s", fmt.fmt.pix.height)
+        log.debug("  Pixel Format: %s", hex(fmt.fmt.pix.pixelformat))
+        log.debug("  Bytes per line: %s", fmt.fmt.pix.bytesperline)
+        log.debug("  Size image: %s", fmt.fmt.pix.sizeimage)
+        log.debug("  Colorspace: %s", fmt.fmt.pix.colorspace)
         current_format = fmt.fmt.pix  # Store the current format
         return True
     except Exception as e:
-        print(f"Failed to set video format: {e}")
+        log.error("Failed to set video format: %s", e)
         return False
 
-def handle_request(fd, ctrl, req, response):
-    print(f"Handling bRequest: 0x{req.bRequest:02x}")
-    if req.bRequest == UVC_GET_CUR:
-        print("-> GET_CUR request")
-        memmove(addressof(response.data), addressof(ctrl), sizeof(uvc_streaming_control))
-        response.length = sizeof(uvc_streaming_control)
-    elif req.bRequest == UVC_GET_MIN:
-        print("-> GET_MIN request")
-        temp_ctrl = uvc_streaming_control()
-        init_streaming_control(temp_ctrl)
-        memmove(addressof(response.data), addressof(temp_ctrl), sizeof(uvc_streaming_control))
-        response.length = sizeof(uvc_streaming_control)
-    elif req.bRequest == UVC_GET_MAX:
-        print("-> GET_MAX request")
-        temp_ctrl = uvc_streaming_control()
-        init_streaming_control(temp_ctrl)
-        memmove(addressof(response.data), addressof(temp_ctrl), sizeof(uvc_streaming_control))
-        response.length = sizeof(uvc_streaming_control)
-    elif req.bRequest == UVC_GET_DEF:
-        print("-> GET_DEF request")
-        temp_ctrl = uvc_streaming_control()
-        init_streaming_control(temp_ctrl)
-        memmove(addressof(response.data), addressof(temp_ctrl), sizeof(uvc_streaming_control))
-        response.length = sizeof(uvc_streaming_control)
-    elif req.bRequest == UVC_GET_INFO:
-        print("-> GET_INFO request")
-        response.data[0] = 0x03
-        response.length = 1
-    elif req.bRequest == UVC_GET_LEN:
-        print("-> GET_LEN request")
-        response.data[0] = sizeof(uvc_streaming_control)
-        response.data[1] = 0x00
-        response.length = 2
-    elif req.bRequest == UVC_SET_CUR:
-        print("-> SET_CUR request")
-        # Handle specific SET_CUR logic if needed
-        response.length = 0  # Acknowledge
-    elif req.bRequest == UVC_GET_RES:
-        print("-> GET_RES request")
-        temp_ctrl = uvc_streaming_control()
-        init_streaming_control(temp_ctrl)
-        memmove(addressof(response.data), addressof(temp_ctrl), sizeof(uvc_streaming_control))
-        response.length = sizeof(uvc_streaming_control)
-    else:
-        print(f"Unhandled bRequest: 0x{req.bRequest:02x}")
-
 def handle_connect_event(event):
-    print("UVC_EVENT_CONNECT")
+    log.debug("UVC_EVENT_CONNECT")
     init_streaming_control(state.probe_control)
     init_streaming_control(state.commit_control)
     state.connected = True
     return None
 
 def handle_disconnect_event(event):
-    print("UVC_EVENT_DISCONNECT")
+    log.debug("UVC_EVENT_DISCONNECT")
     state.connected = False
     return None
 
-def handle_streamon_event(event):
-    """Handle UVC_EVENT_STREAMON"""
-    print("\nUVC_EVENT_STREAMON")
-    global state
-    
-    try:
-        # Start the video stream
-        buf_type = c_int32(V4L2_BUF_TYPE_VIDEO_OUTPUT)
-        print("Starting video stream...")
-        print("#### Calling ioctl: VIDIOC_STREAMON\n");
-        fcntl.ioctl(fd, VIDIOC_STREAMON, buf_type)
-        print("Stream started successfully")
-        
-        if not current_format or not buffers:
-            print("Error: Missing format or buffers")
-            return None
-            
-        print(f"\nCurrent format:")
-        print(f"  Width: {current_format.width}")
-        print(f"  Height: {current_format.height}")
-        print(f"  Pixel format: {hex(current_format.pixelformat)}")
-        print(f"  Bytes per line: {current_format.bytesperline}")
-        print(f"  Size image: {current_format.sizeimage}")
-        
-        # Set frame rate to 30 fps (or desired rate)
-        fps = 30
-        frame_interval = int(1000000000 / fps)  # Convert to nanoseconds
-        print(f"\nSetting frame rate to {fps} fps (interval: {frame_interval}ns)")
-        
-        # Queue initial buffers with timing information
-        for buf in buffers:
-            print(f"\nProcessing buffer {buf['index']}:")
-            
-            # Fill buffer with test pattern
-            bytes_used = generate_test_pattern(
-                buf['mmap'], 
-                current_format.width, 
-                current_format.height
-            )
-            
-            v4l2_buf = v4l2_buffer()
-            v4l2_buf.type = V4L2_BUF_TYPE_VIDEO_OUTPUT
-            v4l2_buf.memory = V4L2_MEMORY_MMAP
-            v4l2_buf.index = buf['index']
-            v4l2_buf.bytesused = bytes_used
-            v4l2_buf.timestamp.tv_sec = 0
-            v4l2_buf.timestamp.tv_usec = 0  # Let kernel set timestamp
-            
-            try:
-                print("#### Calling ioctl: VIDIOC_QBUF\n");
-                fcntl.ioctl(fd, VIDIOC_QBUF, v4l2_buf)
-                print(f"  Successfully queued buffer {buf['index']}")
-            except Exception as e:
-                print(f"  Failed to queue buffer: {e}")
-                print(f"  Error details: {type(e).__name__}")
-        
-        # Start streaming thread with timing control
-        state.streaming = True
-        print("\nStarting streaming thread...")
-        import threading
-        thread = threading.Thread(target=streaming_thread, args=(fps,), daemon=True)
-        thread.start()
-        print("Streaming thread started with ID:", thread.ident)
-            
-    except Exception as e:
-        print(f"Failed to start stream: {e}")
-        print(f"Error details: {type(e).__name__}")
-    
-    return None
-
-def streaming_thread(fps):
-    """Background thread to handle continuous streaming with proper timing"""
-    print("\nStreaming thread started")
-    frame_count = 0
-    pattern_index = 0  # Track which pattern we're using
-    start_time = time.time()
-    
-    # Create a poll object for monitoring buffer availability
-    poll = select.epoll()
-    poll.register(fd, select.EPOLLOUT)
-    
-    # Stats tracking
-    last_stats_time = time.time()
-    frames_since_stats = 0
-    
-    while state.streaming:
-        try:
-            current_time = time.time()
-            
-            # Print stats only once per second
-            if current_time - last_stats_time >= 1.0:
-                actual_fps = frames_since_stats / (current_time - last_stats_time)
-                print(f"FPS: {actual_fps:.1f}, Frames: {frame_count}")
-                last_stats_time = current_time
-                frames_since_stats = 0
-            
-            # Wait for buffer
-            events = poll.poll(10)  # 10ms timeout
-            if not events:
-                continue
-            
-            # Dequeue buffer
-            buf = v4l2_buffer()
-            buf.type = V4L2_BUF_TYPE_VIDEO_OUTPUT
-            buf.memory = V4L2_MEMORY_MMAP
-            
-            try:
-                print("#### Calling ioctl: VIDIOC_DQBUF\n");
-                fcntl.ioctl(fd, VIDIOC_DQBUF, buf)
-            except OSError as e:
-                if e.errno == errno.EAGAIN:
-                    continue
-                raise
-            
-            buffer = buffers[buf.index]
-            
-            # Write next pattern
-            buffer['mmap'].seek(0)
-            buffer['mmap'].write(buffer['patterns'][pattern_index])
-            
-            # Move to next pattern
-            pattern_index = (pattern_index + 1) % 8
-            
-             # Ensure proper buffer size
-            buffer_size = current_format.width * current_format.height * 2
-            buf.bytesused = buffer_size  # Set exact size
-            buf.timestamp.tv_sec = int(current_time)
-            buf.timestamp.tv_usec = int((current_time - int(current_time)) * 1000000)
-            
-            try:
-                print("#### Calling ioctl: VIDIOC_QBUF\n");
-                fcntl.ioctl(fd, VIDIOC_QBUF, buf)
-                frame_count += 1
-                frames_since_stats += 1
-            except OSError as e:
-                if e.errno != errno.EAGAIN:
-                    raise
-                    
-        except Exception as e:
-            if not state.streaming:
-                break
-            print(f"Streaming error: {e}")
-            break
-            
-    poll.unregister(fd)
-    poll.close()
-    print(f"Streaming ended - Average FPS: {frame_count / (time.time() - start_time):.1f}")
-
-def generate_test_pattern(mm, width, height, offset=0):
-    """Optimized test pattern generation with explicit buffer layout"""
-    stride = width * 2  # YUY2 is 2 bytes per pixel
-    total_size = stride * height
-    pattern = bytearray(total_size)
-    
-    # Fill pattern line by line with proper stride
-    for y in range(height):
-        row_offset = y * stride
-        for x in range(0, stride, 4):  # Process 2 pixels (4 bytes) at a time
-            pixel_x = x // 2
-            shifted_x = (pixel_x + offset) % width
-            # Checkerboard based on coordinates
-            is_white = ((y // 64) + (shifted_x // 64)) % 2 == 0
-            
-            # YUY2 pattern: Y1 U Y2 V
-            if is_white:
-                # White in YUV space
-                pattern[row_offset + x:row_offset + x + 4] = bytes([235, 128, 235, 128])
-            else:
-                # Gray in YUV space
-                pattern[row_offset + x:row_offset + x + 4] = bytes([128, 128, 128, 128])
-
-    mm.seek(0)
-    mm.write(bytes(pattern))
-    return total_size
-
-def handle_streamoff_event(event):
-    """Handle UVC_EVENT_STREAMOFF"""
-    print("Handling STREAMOFF event")
-    try:
-        buf_type = c_uint32(V4L2_BUF_TYPE_VIDEO_OUTPUT)
-        print("#### Calling ioctl: VIDIOC_STREAMOFF\n");
-        fcntl.ioctl(fd, VIDIOC_STREAMOFF, buf_type)
-        state.streaming = False
-        print("Stream stopped successfully")
-    except Exception as e:
-        print(f"Failed to stop stream: {e}")
-    return None
+def probe_set_cur(cs, wLength, response):
+    log.debug("  Operation: SET_CUR")
+    log.debug("  👉 Preparing for DATA phase (host will send parameters)")
+
+    state.current_control = cs  # Mark which control is active
+    response.length = wLength  # Indicate host should send data
+
+def probe_get_cur(cs, wLength, response):
+    log.debug("  Operation: GET_CUR")
+
+    if cs == UVC_VS_PROBE_CONTROL:
+        log.debug("  👈 Returning PROBE control values")
+        ctrl = state.probe_control
+        log_streaming_control(state.probe_control, "📊 Current PROBE Values")
+    elif cs == UVC_VS_COMMIT_CONTROL:
+        log.debug("  👈 Returning COMMIT control values")
+        ctrl = state.commit_control
+        log_streaming_control(state.commit_control, "📊 Current COMMIT Values")
+
+    # Ensure that we return the committed values correctly
+    set_response(response, memoryview(ctrl).cast('B'))
+
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("  Response Data:")
+        log.debug("  %s", bytes(response.data[:16]).hex(' '))
+
+def probe_get_min(cs, wLength, response):
+    log.debug("  Operation: GET_MIN")
+    log.debug("  👈 Returning minimum supported values")
+    set_response(response, PROBE_MIN_BYTES)
+
+def probe_get_max(cs, wLength, response):
+    log.debug("  Operation: GET_MAX")
+    log.debug("  👈 Returning maximum supported values")
+    set_response(response, PROBE_MAX_BYTES)
+
+def probe_get_res(cs, wLength, response):
+    log.debug("  Operation: GET_RES")
+    log.debug("  👈 Returning resolution values")
+    set_response(response, PROBE_DEF_BYTES)
+
+def probe_get_info(cs, wLength, response):
+    log.debug("  Operation: GET_INFO")
+    log.debug("  👈 Returning capabilities (0x03: GET/SET supported)")
+    set_response(response, INFO_GET_SET_BYTES)
+
+def probe_get_def(cs, wLength, response):
+    log.debug("  Operation: GET_DEF")
+    log.debug("  👈 Returning default values")
+    set_response(response, PROBE_DEF_BYTES)
+
+def probe_get_len(cs, wLength, response):
+    log.debug("  Operation: GET_LEN")
+    log.debug("  👈 Returning control length")
+    set_response(response, STREAMING_CONTROL_LEN_BYTES)
+
+# PROBE/COMMIT request handlers indexed directly by bRequest
+PROBE_REQUEST_HANDLERS = [None] * 256
+PROBE_REQUEST_HANDLERS[UVC_SET_CUR] = probe_set_cur
+PROBE_REQUEST_HANDLERS[UVC_GET_CUR] = probe_get_cur
+PROBE_REQUEST_HANDLERS[UVC_GET_MIN] = probe_get_min
+PROBE_REQUEST_HANDLERS[UVC_GET_MAX] = probe_get_max
+PROBE_REQUEST_HANDLERS[UVC_GET_RES] = probe_get_res
+PROBE_REQUEST_HANDLERS[UVC_GET_INFO] = probe_get_info
+PROBE_REQUEST_HANDLERS[UVC_GET_DEF] = probe_get_def
+PROBE_REQUEST_HANDLERS[UVC_GET_LEN] = probe_get_len
+PROBE_REQUEST_HANDLERS = tuple(PROBE_REQUEST_HANDLERS)
 
 def handle_setup_event(event):
-    print("\n" + "="*80)
-    print("📍 UVC_EVENT_SETUP - Processing USB Setup Request")
-    print("="*80)
+    log.debug("📍 UVC_EVENT_SETUP - Processing USB Setup Request")
     
-    # Log raw event data with clear separator
-    print("\n📦 Raw Event Data:")
-    print("  Bytes 0-15 (Control Request + Initial Data):")
-    raw_data = bytes(event.u.data.data[:16])
-    print("  " + ' '.join(f'{b:02x}' for b in raw_data))
+    # Log raw event data
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("📦 Raw Event Data:")
+        log.debug("  Bytes 0-15 (Control Request + Initial Data):")
+        log.debug("  %s", bytes(event.u.data.data[:16]).hex(' '))
     
     # Parse request
-    req = usb_ctrlrequest.from_buffer_copy(bytes(event.u.data.data[:8]))
-    response = uvc_request_data()
+    bRequestType, bRequest, wValue, wIndex, wLength = \
+        USB_CTRLREQUEST_STRUCT.unpack_from(event.u.data.data)
+    response = state.response
     response.length = -errno.EL2HLT  # Default response if not handled
     
     # Log request details with clearer structure
-    print("\n🔍 USB Control Request Details:")
-    print(f"  bmRequestType: 0x{req.bRequestType:02x}")
-    print(f"    Direction: {'Device-to-Host' if req.bRequestType & 0x80 else 'Host-to-Device'}")
-    print(f"    Type: {'Class' if (req.bRequestType & 0x60) == 0x20 else 'Standard'}")
-    print(f"    Recipient: {'Interface' if (req.bRequestType & 0x0f) == 1 else 'Other'}")
-    print(f"  bRequest:      0x{req.bRequest:02x} ({uvc_request_name(req.bRequest)})")
-    print(f"  wValue:        0x{req.wValue:04x}")
-    print(f"  wIndex:        0x{req.wIndex:04x}")
-    print(f"  wLength:       {req.wLength}")
+    log.debug("🔍 USB Control Request Details:")
+    log.debug("  bmRequestType: 0x%02x", bRequestType)
+    log.debug("    Direction: %s", 'Device-to-Host' if bRequestType & 0x80 else 'Host-to-Device')
+    log.debug("    Type: %s", 'Class' if (bRequestType & 0x60) == 0x20 else 'Standard')
+    log.debug("    Recipient: %s", 'Interface' if (bRequestType & 0x0f) == 1 else 'Other')
+    log.debug("  bRequest:      0x%02x (%s)", bRequest, uvc_request_name(bRequest))
+    log.debug("  wValue:        0x%04x", wValue)
+    log.debug("  wIndex:        0x%04x", wIndex)
+    log.debug("  wLength:       %s", wLength)
     
     # Parse request type
-    request_type = req.bRequestType & USB_TYPE_MASK
-    print(f"\n📌 Request Category: 0x{request_type:02x} " + 
-          f"({'Class-Specific' if request_type == USB_TYPE_CLASS else 'Standard'})")
+    request_type = bRequestType & USB_TYPE_MASK
+    log.debug("📌 Request Category: 0x%02x (%s)", request_type,
+              'Class-Specific' if request_type == USB_TYPE_CLASS else 'Standard')
     
     if request_type == USB_TYPE_CLASS:
-        cs = (req.wValue >> 8) & 0xFF
-        interface = req.wIndex & 0xFF
+        cs = (wValue >> 8) & 0xFF
+        interface = wIndex & 0xFF
         
-        print(f"\n🔧 Class-Specific Request Details:")
-        print(f"  Control Selector: 0x{cs:02x} " + 
-              f"({'PROBE' if cs == UVC_VS_PROBE_CONTROL else 'COMMIT' if cs == UVC_VS_COMMIT_CONTROL else 'OTHER'})")
-        print(f"  Interface:        {interface} ({'Control' if interface == 0 else 'Streaming' if interface == 1 else 'Unknown'})")
+        log.debug("🔧 Class-Specific Request Details:")
+        log.debug("  Control Selector: 0x%02x (%s)", cs,
+                  'PROBE' if cs == UVC_VS_PROBE_CONTROL else 'COMMIT' if cs == UVC_VS_COMMIT_CONTROL else 'OTHER')
+        log.debug("  Interface:        %s (%s)", interface,
+                  'Control' if interface == 0 else 'Streaming' if interface == 1 else 'Unknown')
         
         if interface == 0:
-            print("\n⚙️ Processing Control Interface Request")
-            response.data[0] = 0x03  # GET_INFO: Indicating GET/SET supported
-            response.length = req.wLength
+            log.debug("⚙️ Processing Control Interface Request")
+            # GET_INFO: Indicating GET/SET supported
+            set_response(response, CONTROL_INTERFACE_BYTES[:wLength])
+            response.length = wLength
             
         elif interface == 1:
-            print("\n🎥 Processing Streaming Interface Request")
+            log.debug("🎥 Processing Streaming Interface Request")
 
             if cs in [UVC_VS_PROBE_CONTROL, UVC_VS_COMMIT_CONTROL]:
                 phase = "PROBE" if cs == UVC_VS_PROBE_CONTROL else "COMMIT"
-                print(f"  Phase: {phase} Control")
-
-                if req.bRequest == UVC_SET_CUR:
-                    print("  Operation: SET_CUR")
-                    print("  👉 Preparing for DATA phase (host will send parameters)")
-                    
-                    state.current_control = cs  # Mark which control is active
-                    response.length = req.wLength  # Indicate host should send data
-                    
-                elif req.bRequest == UVC_GET_CUR:
-                    print("  Operation: GET_CUR")
-
-                    if cs == UVC_VS_PROBE_CONTROL:
-                        print("  👈 Returning PROBE control values")
-                        ctrl = state.probe_control
-                        log_streaming_control(state.probe_control, "📊 Current PROBE Values")
-                    elif cs == UVC_VS_COMMIT_CONTROL:
-                        print("  👈 Returning COMMIT control values")
-                        ctrl = state.commit_control
-                        log_streaming_control(state.commit_control, "📊 Current COMMIT Values")
-
-                    # Ensure that we return the committed values correctly
-                    memmove(addressof(response.data), addressof(ctrl), sizeof(uvc_streaming_control))
-                    response.length = sizeof(uvc_streaming_control)
-                    
-                    print("  Response Data:")
-                    print('  ' + ' '.join(f'{b:02x}' for b in bytes(response.data[:16])))
-
-                elif req.bRequest == UVC_GET_MIN:
-                    print("  Operation: GET_MIN")
-                    print("  👈 Returning minimum supported values")
-                    temp_ctrl = uvc_streaming_control()
-                    init_streaming_control(temp_ctrl, mode='min')
-                    memmove(addressof(response.data), addressof(temp_ctrl), sizeof(uvc_streaming_control))
-                    response.length = sizeof(uvc_streaming_control)
-
-                elif req.bRequest == UVC_GET_MAX:
-                    print("  Operation: GET_MAX")
-                    print("  👈 Returning maximum supported values")
-                    temp_ctrl = uvc_streaming_control()
-                    init_streaming_control(temp_ctrl, mode='max')
-                    memmove(addressof(response.data), addressof(temp_ctrl), sizeof(uvc_streaming_control))
-                    response.length = sizeof(uvc_streaming_control)
-
-                elif req.bRequest == UVC_GET_RES:
-                    print("  Operation: GET_RES")
-                    print("  👈 Returning resolution values")
-                    temp_ctrl = uvc_streaming_control()
-                    init_streaming_control(temp_ctrl)
-                    memmove(addressof(response.data), addressof(temp_ctrl), sizeof(uvc_streaming_control))
-                    response.length = sizeof(uvc_streaming_control)
-
-                elif req.bRequest == UVC_GET_INFO:
-                    print("  Operation: GET_INFO")
-                    print("  👈 Returning capabilities (0x03: GET/SET supported)")
-                    response.data[0] = 0x03
-                    response.length = 1
-
-                elif req.bRequest == UVC_GET_DEF:
-                    print("  Operation: GET_DEF")
-                    print("  👈 Returning default values")
-                    temp_ctrl = uvc_streaming_control()
-                    init_streaming_control(temp_ctrl)
-                    memmove(addressof(response.data), addressof(temp_ctrl), sizeof(uvc_streaming_control))
-                    response.length = sizeof(uvc_streaming_control)
-
-    print(f"\n📤 Response Summary:")
-    print(f"  Length: {response.length} bytes")
-    if response.length > 0:
-        print("  Data (first 16 bytes):")
-        resp_data = bytes(response.data[:min(16, response.length)])
-        print('  ' + ' '.join(f'{b:02x}' for b in resp_data))
+                log.debug("  Phase: %s Control", phase)
+
+                handler = PROBE_REQUEST_HANDLERS[bRequest]
+                if handler:
+                    handler(cs, wLength, response)
+                else:
+                    log.warning("  Unhandled bRequest: 0x%02x", bRequest)
+
+    log.debug("📤 Response Summary:")
+    log.debug("  Length: %s bytes", response.length)
+    if response.length > 0 and log.isEnabledFor(logging.DEBUG):
+        log.debug("  Data (first 16 bytes):")
+        log.debug("  %s", bytes(response.data[:min(16, response.length)]).hex(' '))
     
-    print("="*80 + "\n")
     return response
 
 
 def handle_data_event(event):
-    print("\n" + "="*80)
-    print("📥 UVC_EVENT_DATA - Processing Streaming Parameters")
-    print("="*80)
+    log.debug("📥 UVC_EVENT_DATA - Processing Streaming Parameters")
     
     if state.current_control is None:
-        print("❌ Error: No active control context")
-        print("    Current state is invalid - expecting PROBE or COMMIT control")
+        log.error("❌ Error: No active control context")
+        log.debug("    Current state is invalid - expecting PROBE or COMMIT control")
         return None
 
     phase = "PROBE" if state.current_control == UVC_VS_PROBE_CONTROL else "COMMIT"
-    print(f"\n📦 Raw Event Data for {phase} Phase:")
-    print("  Complete payload (first 64 bytes):")
-    raw_event_data = bytes(event.u)[:64]
-    print("  " + ' '.join(f'{b:02x}' for b in raw_event_data))
-
-    control_data = raw_event_data[8:8 + sizeof(uvc_streaming_control)]
-    data_len = len(control_data)
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("📦 Raw Event Data for %s Phase:", phase)
+        log.debug("  Complete payload (first 64 bytes):")
+        log.debug("  %s", bytes(event.u)[:64].hex(' '))
+
+    # This union starts 4 bytes before the kernel's, so u.data.data begins
+    # with the kernel's uvc_request_data length and the payload follows it
+    payload = memoryview(event.u.data.data).cast('B')
+    data_len, = REQUEST_LENGTH_STRUCT.unpack_from(payload)
+    # Copy no more than the host sent and no more than a streaming control
+    copy_len = max(0, min(data_len, SIZEOF_UVC_STREAMING_CONTROL))
     
-    print(f"\n🔍 Control Parameters:")
-    print(f"  Received Length: {data_len} bytes")
-    print(f"  Expected Length: {sizeof(uvc_streaming_control)} bytes")
-    print("  Parameter Data:")
-    print("  " + ' '.join(f'{b:02x}' for b in control_data[:16]))
-
-    if data_len != sizeof(uvc_streaming_control):
-        print(f"⚠️ Length Mismatch - Received: {data_len}, Expected: {sizeof(uvc_streaming_control)}")
+    log.debug("🔍 Control Parameters:")
+    log.debug("  Received Length: %s bytes", data_len)
+    log.debug("  Expected Length: %s bytes", SIZEOF_UVC_STREAMING_CONTROL)
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("  Parameter Data:")
+        log.debug("  %s", payload[4:4 + min(copy_len, 16)].hex(' '))
+
+    if data_len < UVC10_STREAMING_CONTROL_SIZE:
+        log.warning("⚠️ Length Mismatch - Received: %s, Expected: %s", data_len, SIZEOF_UVC_STREAMING_CONTROL)
+        state.current_control = None
         return None
+    if data_len != SIZEOF_UVC_STREAMING_CONTROL:
+        # UVC 1.0 hosts send the shorter 26 byte control; the fields past
+        # the payload stay zero
+        log.debug("  Length Mismatch - Received: %s, Expected: %s", data_len, SIZEOF_UVC_STREAMING_CONTROL)
 
     try:
-        print("\n🔄 Processing Streaming Control Parameters")
-        ctrl = uvc_streaming_control.from_buffer_copy(control_data)
+        log.debug("🔄 Processing Streaming Control Parameters")
+        ctrl = uvc_streaming_control()
+        memoryview(ctrl).cast('B')[:copy_len] = payload[4:4 + copy_len]
         log_streaming_control(ctrl, "📊 Received Parameters")
 
         # Calculate and log FPS
         fps = 1000000/ctrl.dwFrameInterval if ctrl.dwFrameInterval > 0 else 0
-        print(f"\n⏱️ Calculated FPS: {fps:.2f}")
+        log.info("⏱️ Calculated FPS: %.2f", fps)
 
         if state.current_control == UVC_VS_PROBE_CONTROL:
-            print("\n🔵 PROBE Phase - Storing Parameters")
-            memmove(addressof(state.probe_control), control_data, sizeof(uvc_streaming_control))
-            memmove(addressof(state.commit_control), control_data, sizeof(uvc_streaming_control))
+            log.debug("🔵 PROBE Phase - Storing Parameters")
+            memmove(state.probe_addr, addressof(ctrl), SIZEOF_UVC_STREAMING_CONTROL)
+            memmove(state.commit_addr, addressof(ctrl), SIZEOF_UVC_STREAMING_CONTROL)
             log_streaming_control(state.probe_control, "✅ Updated PROBE State")
             
         elif state.current_control == UVC_VS_COMMIT_CONTROL:
-            print("\n🟢 COMMIT Phase - Finalizing Parameters")
+            log.debug("🟢 COMMIT Phase - Finalizing Parameters")
 
             if ctrl.dwMaxPayloadTransferSize == 0:
-                print("⚠️ Invalid dwMaxPayloadTransferSize detected")
-                print("  • Setting to safe default: 3072 (USB 2.0 compatible)")
+                log.warning("⚠️ Invalid dwMaxPayloadTransferSize detected")
+                log.debug("  • Setting to safe default: 3072 (USB 2.0 compatible)")
                 ctrl.dwMaxPayloadTransferSize = 3072
 
-            memmove(addressof(state.commit_control), addressof(ctrl), sizeof(uvc_streaming_control))
+            memmove(state.commit_addr, addressof(ctrl), SIZEOF_UVC_STREAMING_CONTROL)
             log_streaming_control(state.commit_control, "✅ Final COMMIT Configuration")
 
-            print("\n✅ COMMIT Received - Allocating Buffers")
+            log.debug("✅ COMMIT Received - Allocating Buffers")
             global buffers
             buffers = init_video_buffers(fd)  # Allocate buffers **after COMMIT**
             
             if not buffers:
-                print("❌ Failed to allocate buffers after COMMIT")
+                log.error("❌ Failed to allocate buffers after COMMIT")
                 return None
 
-            print(f"✅ Allocated {len(buffers)} buffers")
+            log.debug("✅ Allocated %s buffers", len(buffers))
 
-            print("\n🤝 Sending COMMIT Acknowledgment")
-            response = uvc_request_data()
+            log.debug("🤝 Sending COMMIT Acknowledgment")
+            response = state.response
             response.length = 0
-            print("#### Calling ioctl: UVCIOC_SEND_RESPONSE\n");
             fcntl.ioctl(fd, UVCIOC_SEND_RESPONSE, response)
-            print("✅ COMMIT acknowledged - Ready for streaming")
+            log.debug("✅ COMMIT acknowledged - Ready for streaming")
 
     except Exception as e:
-        print("\n❌ Error Processing Control Data:")
-        print(f"  Exception: {type(e).__name__}")
-        print(f"  Message: {str(e)}")
+        log.error("❌ Error Processing Control Data:")
+        log.debug("  Exception: %s", type(e).__name__)
+        log.debug("  Message: %s", str(e))
         return None
 
-    print("\n🔄 Clearing control context")
+    log.debug("🔄 Clearing control context")
     state.current_control = None
 
-    print("="*80 + "\n")
     return None
 
 
@@ -961,42 +855,31 @@ def handle_data_event(event):
 
 def init_video_buffers(fd):
     """Initialize video buffers following v4l2_alloc_buffers() in v4l2.c"""
-    print("\nInitializing video buffers")
+    log.debug("Initializing video buffers")
     
     # Request buffers
     req = v4l2_requestbuffers()
-    req.count = 4
+    req.count = TEST_PATTERN_STEPS
     req.type = V4L2_BUF_TYPE_VIDEO_OUTPUT
     req.memory = V4L2_MEMORY_MMAP
     
     try:
-        print("#### Calling ioctl: VIDIOC_REQBUFS\n");
         fcntl.ioctl(fd, VIDIOC_REQBUFS, req)
     except Exception as e:
-        print(f"Failed to request buffers: {e}")
+        log.error("Failed to request buffers: %s", e)
         return None
         
-    print(f"{req.count} buffers requested.")
+    log.debug("%s buffers requested.", req.count)
     
-    # Pre-generate 8 patterns with different offsets
+    # One pattern per granted buffer. Each buffer is filled once here and
+    # then only requeued, so the animation step is the buffer itself.
     patterns = []
-    for i in range(8):
-        pattern = bytearray()
-        bytes_per_line = current_format.width * 2
-        square_size = 64
-        offset = (i * current_format.width) // 8  # Divide width into 8 steps
-        
-        for y in range(current_format.height):
-            for x in range(0, bytes_per_line, 4):
-                pixel_x = x // 2
-                shifted_x = (pixel_x + offset) % current_format.width
-                is_white = ((y // square_size) + (shifted_x // square_size)) % 2 == 0
-                color = WHITE if is_white else GRAY
-                pattern.extend(color.to_bytes(4, byteorder='little'))
-        
-        patterns.append(bytes(pattern))
+    for i in range(req.count):
+        offset = (i * current_format.width) // req.count  # Divide width into steps
+        patterns.append(build_test_pattern(current_format.width,
+                                           current_format.height, offset))
     
-    print(f"Generated {len(patterns)} patterns")
+    log.debug("Generated %s patterns", len(patterns))
     
     # Allocate buffer objects
     buffers = []
@@ -1008,75 +891,54 @@ def init_video_buffers(fd):
         buf.index = i
         
         try:
-            print("#### Calling ioctl: VIDIOC_QUERYBUF\n");
             fcntl.ioctl(fd, VIDIOC_QUERYBUF, buf)
         except Exception as e:
-            print(f"Failed to query buffer {i}: {e}")
+            log.error("Failed to query buffer %s: %s", i, e)
             return None
             
         # mmap the buffer
         try:
+            # MAP_POPULATE faults the whole buffer in up front so the first
+            # frames do not take page faults
             mm = mmap.mmap(fd, buf.length, 
-                          flags=mmap.MAP_SHARED,
+                          flags=mmap.MAP_SHARED | mmap.MAP_POPULATE,
                           prot=mmap.PROT_READ | mmap.PROT_WRITE,
                           offset=buf.m.offset)
                           
-            print(f"Buffer {i}:")
-            print(f"  Mapped at offset {buf.m.offset}")
-            print(f"  Length: {buf.length}")
+            log.debug("Buffer %s:", i)
+            log.debug("  Mapped at offset %s", buf.m.offset)
+            log.debug("  Length: %s", buf.length)
             
-            # Write initial pattern
-            mm.seek(0)
-            mm.write(patterns[0])
+            # Write this buffer's pattern; it is never rewritten
+            view = memoryview(mm)
+            view[:len(patterns[i])] = patterns[i]
+            
+            # Descriptor reused for every QBUF of this buffer
+            qbuf = v4l2_buffer()
+            qbuf.type = V4L2_BUF_TYPE_VIDEO_OUTPUT
+            qbuf.memory = V4L2_MEMORY_MMAP
+            qbuf.index = i
+            qbuf.bytesused = len(patterns[i])
             
             buffers.append({
                 'index': i,
                 'length': buf.length,
                 'mmap': mm,
+                'view': view,
                 'start': mm,
-                'pattern_size': len(patterns[0]),
-                'patterns': patterns  # Store all patterns with the buffer
+                'pattern_size': len(patterns[i]),
+                'v4l2_buf': qbuf,
             })
         except Exception as e:
-            print(f"Failed to mmap buffer {i}: {e}")
+            log.error("Failed to mmap buffer %s: %s", i, e)
             # Clean up previously mapped buffers
             for b in buffers:
+                b['view'].release()
                 b['mmap'].close()
             return None
     
     return buffers
 
-def queue_initial_buffers(fd, buffers, width, height):
-    """Queue initial buffers with test pattern"""
-    for buf in buffers:
-        # Fill buffer with test pattern
-        bytes_used = generate_test_pattern(buf['mmap'], width, height)
-        
-        # Queue the buffer
-        v4l2_buf = v4l2_buffer()
-        v4l2_buf.type = V4L2_BUF_TYPE_VIDEO_OUTPUT
-        v4l2_buf.memory = V4L2_MEMORY_MMAP
-        v4l2_buf.index = buf['index']
-        v4l2_buf.bytesused = bytes_used
-        
-        try:
-            print("#### Calling ioctl: VIDIOC_QBUF\n");
-            fcntl.ioctl(fd, VIDIOC_QBUF, v4l2_buf)
-            print(f"Queued buffer {buf['index']}")
-        except Exception as e:
-            print(f"Failed to queue buffer {buf['index']}: {e}")
-            return False
-    return True
-
-EVENT_HANDLERS = {
-    UVC_EVENT_CONNECT: handle_connect_event,
-    UVC_EVENT_DISCONNECT: handle_disconnect_event,
-    UVC_EVENT_SETUP: handle_setup_event,
-    UVC_EVENT_DATA: handle_data_event,
-    UVC_EVENT_STREAMON: handle_streamon_event,
-    UVC_EVENT_STREAMOFF: handle_streamoff_event,
-}
-
 def subscribe_events(fd):
     """Subscribe to all UVC events"""
     events = [
@@ -1091,258 +953,301 @@ def subscribe_events(fd):
     for event_type in events:
         sub = v4l2_event_subscription(type=event_type)
         try:
-            print("#### Calling ioctl: VIDIOC_SUBSCRIBE_EVENT\n");
             fcntl.ioctl(fd, VIDIOC_SUBSCRIBE_EVENT, sub)
-            print(f"Subscribed to event 0x{event_type:08x}")
+            log.debug("Subscribed to event 0x%08x", event_type)
         except Exception as e:
-            print(f"Failed to subscribe to event 0x{event_type:08x}: {e}")
+            log.error("Failed to subscribe to event 0x%08x: %s", event_type, e)
             return -1
     return 0
 
 def stream_on(fd):
     """Start video streaming"""
-    buf_type = c_int32(V4L2_BUF_TYPE_VIDEO_OUTPUT)
     try:
-        print("#### Calling ioctl: VIDIOC_STREAMON\n");
-        fcntl.ioctl(fd, VIDIOC_STREAMON, byref(buf_type))
-        print("Stream ON successful")
+        fcntl.ioctl(fd, VIDIOC_STREAMON, BUF_TYPE_OUTPUT)
+        log.debug("Stream ON successful")
         return True
     except Exception as e:
-        print(f"Failed to start stream: {e}")
+        log.error("Failed to start stream: %s", e)
         return False
 
 def stream_off(fd):
     """Stop video streaming"""
-    buf_type = c_int32(V4L2_BUF_TYPE_VIDEO_OUTPUT)
     try:
-        print("#### Calling ioctl: VIDIOC_STREAMOFF\n");
-        fcntl.ioctl(fd, VIDIOC_STREAMOFF, byref(buf_type))
-        print("Stream OFF successful")
+        fcntl.ioctl(fd, VIDIOC_STREAMOFF, BUF_TYPE_OUTPUT)
+        log.debug("Stream OFF successful")
         return True
     except Exception as e:
-        print(f"Failed to stop stream: {e}")
+        log.error("Failed to stop stream: %s", e)
         return False
 
 def handle_streamon_event(event):
     """Handle UVC_EVENT_STREAMON"""
-    print("\nUVC_EVENT_STREAMON")
+    log.debug("UVC_EVENT_STREAMON")
     global state
     
     try:
+        # STREAMON without a STREAMOFF in between: stop the old threads
+        # before the new stream starts
+        if state.threads:
+            stop_streaming_threads()
+        
         # Start the video stream
-        buf_type = c_int32(V4L2_BUF_TYPE_VIDEO_OUTPUT)
-        print("Starting video stream...")
-        print("#### Calling ioctl: VIDIOC_STREAMON\n");
-        fcntl.ioctl(fd, VIDIOC_STREAMON, buf_type)
-        print("Stream started successfully")
+        log.debug("Starting video stream...")
+        fcntl.ioctl(fd, VIDIOC_STREAMON, BUF_TYPE_OUTPUT)
+        log.debug("Stream started successfully")
         
         if not current_format or not buffers:
-            print("Error: Missing format or buffers")
+            log.error("Error: Missing format or buffers")
             return None
             
-        print(f"\nCurrent format:")
-        print(f"  Width: {current_format.width}")
-        print(f"  Height: {current_format.height}")
-        print(f"  Pixel format: {hex(current_format.pixelformat)}")
-        print(f"  Bytes per line: {current_format.bytesperline}")
-        print(f"  Size image: {current_format.sizeimage}")
+        log.debug("Current format:")
+        log.debug("  Width: %s", current_format.width)
+        log.debug("  Height: %s", current_format.height)
+        log.debug("  Pixel format: %s", hex(current_format.pixelformat))
+        log.debug("  Bytes per line: %s", current_format.bytesperline)
+        log.debug("  Size image: %s", current_format.sizeimage)
         
         # Use the committed frame interval for FPS
         frame_interval_ns = state.commit_control.dwFrameInterval * 100  # Convert to nanoseconds
         fps = int(1000000000 / frame_interval_ns) if frame_interval_ns > 0 else 30
-        print(f"\nUsing committed settings:")
-        print(f"  Frame interval: {frame_interval_ns}ns")
-        print(f"  Target FPS: {fps}")
+        log.debug("Using committed settings:")
+        log.debug("  Frame interval: %sns", frame_interval_ns)
+        log.info("  Target FPS: %s", fps)
         
         # Queue initial buffers with timing information
         for buf in buffers:
-            print(f"\nProcessing buffer {buf['index']}:")
-            
-            # Fill buffer with test pattern
-            bytes_used = generate_test_pattern(
-                buf['mmap'], 
-                current_format.width, 
-                current_format.height
-            )
+            log.debug("Processing buffer %s:", buf['index'])
             
-            v4l2_buf = v4l2_buffer()
-            v4l2_buf.type = V4L2_BUF_TYPE_VIDEO_OUTPUT
-            v4l2_buf.memory = V4L2_MEMORY_MMAP
-            v4l2_buf.index = buf['index']
-            v4l2_buf.bytesused = bytes_used
+            # Buffer already holds its own pattern from init_video_buffers()
+            # and its descriptor already carries index and bytesused
+            v4l2_buf = buf['v4l2_buf']
             v4l2_buf.timestamp.tv_sec = 0
             v4l2_buf.timestamp.tv_usec = 0  # Let kernel set timestamp
             
             try:
-                print("#### Calling ioctl: VIDIOC_QBUF\n");
                 fcntl.ioctl(fd, VIDIOC_QBUF, v4l2_buf)
-                print(f"  Successfully queued buffer {buf['index']}")
+                log.debug("  Successfully queued buffer %s", buf['index'])
             except Exception as e:
-                print(f"  Failed to queue buffer: {e}")
-                print(f"  Error details: {type(e).__name__}")
+                log.error("  Failed to queue buffer: %s", e)
+                log.error("  Error details: %s", type(e).__name__)
+        
+        # Clear a stop request left over from a previous stream
+        try:
+            os.eventfd_read(state.stop_fd)
+        except BlockingIOError:
+            pass
+        state.stop_event.clear()
         
         # Start streaming thread with timing control
         state.streaming = True
-        print("\nStarting streaming thread...")
-        import threading
-        thread = threading.Thread(target=streaming_thread, args=(fps,), daemon=True)
+        state.frame_count = 0
+        log.debug("Starting streaming thread...")
+        thread = threading.Thread(target=streaming_thread, args=(fps,),
+                                  name="uvc-stream", daemon=True)
         thread.start()
-        print("Streaming thread started with ID:", thread.ident)
+        state.threads.append(thread)
+        log.debug("Streaming thread started with ID: %s", thread.ident)
+        
+        # FPS reporting lives off the streaming path and only runs when
+        # it would be logged
+        if log.isEnabledFor(logging.INFO):
+            thread = threading.Thread(target=stats_thread, name="uvc-stats",
+                                      daemon=True)
+            thread.start()
+            state.threads.append(thread)
             
     except Exception as e:
-        print(f"Failed to start stream: {e}")
-        print(f"Error details: {type(e).__name__}")
+        log.error("Failed to start stream: %s", e)
+        log.error("Error details: %s", type(e).__name__)
     
     return None
 
+def set_realtime_priority():
+    """Pin the calling thread to one CPU and run it under SCHED_FIFO
+
+    Raising the scheduling class requires CAP_SYS_NICE (or root); without it
+    the thread keeps the default policy and streaming still works.
+    """
+    # Kernel thread name, so the thread shows up in top/perf
+    libc.prctl(PR_SET_NAME, threading.current_thread().name.encode(), 0, 0, 0)
+
+    # Use the highest CPU we are allowed on, away from the usual CPU 0 load
+    cpu = max(os.sched_getaffinity(0))
+    try:
+        os.sched_setaffinity(0, {cpu})
+        log.debug("Streaming thread pinned to CPU %d", cpu)
+    except OSError as e:
+        log.warning("Failed to pin streaming thread to CPU %d: %s", cpu, e)
+
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO,
+                              os.sched_param(STREAMING_THREAD_PRIORITY))
+        log.debug("Streaming thread running SCHED_FIFO priority %d",
+                  STREAMING_THREAD_PRIORITY)
+    except PermissionError:
+        log.warning("No permission for SCHED_FIFO (needs CAP_SYS_NICE), "
+                    "streaming with the default scheduler")
+
 def streaming_thread(fps):
     """Background thread to handle continuous streaming with proper timing"""
-    print("\nStreaming thread started")
-    print(f"Current format:")
-    print(f"  Width: {current_format.width}")
-    print(f"  Height: {current_format.height}")
-    print(f"  Bytes per line: {current_format.bytesperline}")
-    print(f"  Size image: {current_format.sizeimage}")
-    print(f"  dwMaxVideoFrameSize: {state.commit_control.dwMaxVideoFrameSize}")
-    print(f"  Actual buffer size being used: {buffers[0]['length']}")
+    log.debug("Streaming thread started")
+    set_realtime_priority()
+    log.debug("Current format:")
+    log.debug("  Width: %s", current_format.width)
+    log.debug("  Height: %s", current_format.height)
+    log.debug("  Bytes per line: %s", current_format.bytesperline)
+    log.debug("  Size image: %s", current_format.sizeimage)
+    log.debug("  dwMaxVideoFrameSize: %s", state.commit_control.dwMaxVideoFrameSize)
+    log.debug("  Actual buffer size being used: %s", buffers[0]['length'])
     
+    # Pacing runs on the same monotonic clock as the buffer timestamps, in
+    # integer nanoseconds
     frame_count = 0
-    pattern_index = 0
-    start_time = time.time()
-    frame_interval = 1.0 / fps
-    
-    # Stats tracking
-    last_stats_time = time.time()
-    frames_since_stats = 0
+    start_ns = time.monotonic_ns()
+    frame_interval_ns = 1000000000 // fps
     
     poll = select.epoll()
-    poll.register(fd, select.EPOLLOUT)
+    poll.register(fd, select.EPOLLOUT | select.EPOLLET)
+    poll.register(state.stop_fd, select.EPOLLIN)
+    
+    # One buffer descriptor for the whole stream: DQBUF rewrites it in place
+    # and only bytesused/timestamp are updated before it is queued again
+    buf = v4l2_buffer()
+    buf.type = V4L2_BUF_TYPE_VIDEO_OUTPUT
+    buf.memory = V4L2_MEMORY_MMAP
+    
+    # Loop-invariant lookups bound to locals once. The committed frame size
+    # cannot change while streaming.
+    ioctl = fcntl.ioctl
+    monotonic_ns = time.monotonic_ns
+    timestamp = buf.timestamp
+    frame_size = state.commit_control.dwMaxVideoFrameSize
     
     while state.streaming:
         try:
-            current_time = time.time()
-            
-            # Print stats only once per second
-            if current_time - last_stats_time >= 1.0:
-                actual_fps = frames_since_stats / (current_time - last_stats_time)
-                print(f"FPS: {actual_fps:.1f}, Frames: {frame_count}")
-                last_stats_time = current_time
-                frames_since_stats = 0
-            
-            # Wait for buffer with proper timing
-            next_frame_time = start_time + (frame_count + 1) * frame_interval
-            wait_time = max(0, next_frame_time - current_time)
-            if wait_time > 0:
-                time.sleep(wait_time)
-            
-            events = poll.poll(10)  # 10ms timeout
-            if not events:
-                continue
-            
-            buf = v4l2_buffer()
-            buf.type = V4L2_BUF_TYPE_VIDEO_OUTPUT
-            buf.memory = V4L2_MEMORY_MMAP
-            
-            try:
-                print("#### Calling ioctl: VIDIOC_DQBUF\n");
-                fcntl.ioctl(fd, VIDIOC_DQBUF, buf)
-            except OSError as e:
-                if e.errno == errno.EAGAIN:
-                    continue
-                raise
-            
-            buffer = buffers[buf.index]
-            
-            # Write next pattern
-            buffer['mmap'].seek(0)
-            buffer['mmap'].write(buffer['patterns'][pattern_index])
-            
-            # Move to next pattern
-            pattern_index = (pattern_index + 1) % 8
+            # Block until the driver returns a buffer or STREAMOFF writes
+            # stop_fd, so no timeout is needed
+            poll.poll()
             
-            # Use committed size
-            buf.bytesused = state.commit_control.dwMaxVideoFrameSize
-            buf.timestamp.tv_sec = int(current_time)
-            buf.timestamp.tv_usec = int((current_time - int(current_time)) * 1000000)
-            
-            try:
-                print("#### Calling ioctl: VIDIOC_QBUF\n");
-                fcntl.ioctl(fd, VIDIOC_QBUF, buf)
-                frame_count += 1
-                frames_since_stats += 1
-            except OSError as e:
-                if e.errno != errno.EAGAIN:
+            # The wait is edge-triggered, so take every finished buffer
+            # before waiting again
+            while state.streaming:
+                try:
+                    ioctl(fd, VIDIOC_DQBUF, buf)
+                except OSError as e:
+                    if e.errno == errno.EAGAIN:
+                        break
                     raise
+                
+                # Pace every requeue, not every wakeup: one wakeup can return
+                # several buffers, which would otherwise go out back to back
+                wait_ns = start_ns + (frame_count + 1) * frame_interval_ns - monotonic_ns()
+                if wait_ns > 0:
+                    time.sleep(wait_ns / 1000000000)
+                    if not state.streaming:
+                        break
+                
+                # Buffers come back in queue order and each one holds a fixed
+                # pattern step, so requeueing it as-is animates the stream
+                # Use committed size
+                buf.bytesused = frame_size
+                sec, nsec = divmod(monotonic_ns(), 1000000000)
+                timestamp.tv_sec = sec
+                timestamp.tv_usec = nsec // 1000
+                
+                try:
+                    ioctl(fd, VIDIOC_QBUF, buf)
+                    frame_count += 1
+                    state.frame_count = frame_count
+                except OSError as e:
+                    if e.errno != errno.EAGAIN:
+                        raise
                     
         except Exception as e:
             if not state.streaming:
                 break
-            print(f"Streaming error: {e}")
+            log.error("Streaming error: %s", e)
             break
             
-    poll.unregister(fd)
     poll.close()
-    print(f"Streaming ended - Average FPS: {frame_count / (time.time() - start_time):.1f}")
-
-def generate_test_pattern(mm, width, height, offset=0):
-    """Optimized test pattern generation"""
-    bytes_per_line = width * 2
-    total_size = bytes_per_line * height
-    pattern = bytearray(total_size)  # Pre-allocate full buffer
-    square_size = 64
-    horizontal_offset = offset % width
+    log.info("Streaming ended - Average FPS: %.1f",
+             frame_count * 1000000000 / (time.monotonic_ns() - start_ns))
+
+def stats_thread():
+    """Log the streaming thread's frame rate once per second"""
+    last_ns = time.monotonic_ns()
+    last_count = state.frame_count
     
-    for y in range(height):
-        line_offset = y * bytes_per_line
-        for x in range(0, bytes_per_line, 4):
-            pixel_x = x // 2
+    while not state.stop_event.wait(STATS_INTERVAL_NS / 1000000000):
+        now_ns = time.monotonic_ns()
+        frame_count = state.frame_count
+        actual_fps = (frame_count - last_count) * 1000000000 / (now_ns - last_ns)
+        log.info("FPS: %.1f, Frames: %s", actual_fps, frame_count)
+        last_ns = now_ns
+        last_count = frame_count
+
+def build_test_pattern(width, height, offset=0):
+    """Build a YUYV checkerboard frame shifted left by offset pixels"""
+    # Squares are 1 << square_shift pixels wide, so the square a coordinate
+    # falls in is a shift and its parity a mask
+    square_shift = 6
+
+    # Every line in a band of squares is identical, and the two band
+    # parities only swap WHITE and GRAY, so build two lines and repeat
+    rows = []
+    for band in range(2):
+        row = []
+        for pixel_x in range(0, width, 2):  # 2 pixels (4 bytes) at a time
             shifted_x = (pixel_x + offset) % width
-            is_white = ((y // 64) + (shifted_x // 64)) % 2 == 0
-            color = WHITE if is_white else GRAY
-            pattern[line_offset + x:line_offset + x + 4] = color.to_bytes(4, byteorder='little')
-
-    mm.seek(0)
-    mm.write(bytes(pattern))
-    return total_size  # Return exact buffer size
+            is_white = ((band ^ (shifted_x >> square_shift)) & 1) == 0
+            row.append(WHITE_LE if is_white else GRAY_LE)
+        rows.append(b''.join(row))
+
+    return b''.join(rows[(y >> square_shift) & 1] for y in range(height))
+
+def stop_streaming_threads():
+    """Signal the streaming and stats threads to stop and wait for them"""
+    state.streaming = False
+    state.stop_event.set()
+    os.eventfd_write(state.stop_fd, 1)
+    # Both threads wake on the stop signals above, at most one frame
+    # interval later
+    for thread in state.threads:
+        thread.join()
+    state.threads.clear()
 
 def handle_streamoff_event(event):
     """Handle UVC_EVENT_STREAMOFF"""
-    print("Handling STREAMOFF event")
-    return stream_off(fd)
-
-def process_frame(mm, width, height, frame_count):
-    """Process a single frame with proper timing"""
-    offset = frame_count % width  # Create movement effect
-    bytes_written = generate_test_pattern(mm, width, height, offset)
-    print(f"\nProcessing buffer {frame_count % 4}:")  # Assuming 4 buffers
-    return bytes_written
-
-def stream_video(fd, width, height, fps):
-    """Stream video with proper timing"""
-    frame_count = 0
-    interval = 1.0 / fps  # Calculate interval between frames
-    next_frame_time = time.time()
+    log.debug("Handling STREAMOFF event")
+    stop_streaming_threads()
+    stream_off(fd)
+    return None
 
-    while True:
-        try:
-            current_time = time.time()
-            if current_time >= next_frame_time:
-                # Process and queue the next frame
-                process_frame(mm, width, height, frame_count)
-                frame_count += 1
-                next_frame_time = current_time + interval
-                
-                # Sleep for a small amount to prevent CPU spinning
-                sleep_time = max(0, next_frame_time - time.time())
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
-            else:
-                # Small sleep to prevent CPU spinning while waiting
-                time.sleep(0.001)
-                
-        except Exception as e:
-            print(f"Error in streaming loop: {e}")
-            break
+# UVC event handlers indexed by event.type - V4L2_EVENT_PRIVATE_START; the
+# UVC event types are consecutive private event numbers
+EVENT_HANDLERS = [None] * (UVC_EVENT_DATA - V4L2_EVENT_PRIVATE_START + 1)
+EVENT_HANDLERS[UVC_EVENT_CONNECT - V4L2_EVENT_PRIVATE_START] = handle_connect_event
+EVENT_HANDLERS[UVC_EVENT_DISCONNECT - V4L2_EVENT_PRIVATE_START] = handle_disconnect_event
+EVENT_HANDLERS[UVC_EVENT_STREAMON - V4L2_EVENT_PRIVATE_START] = handle_streamon_event
+EVENT_HANDLERS[UVC_EVENT_STREAMOFF - V4L2_EVENT_PRIVATE_START] = handle_streamoff_event
+EVENT_HANDLERS[UVC_EVENT_SETUP - V4L2_EVENT_PRIVATE_START] = handle_setup_event
+EVENT_HANDLERS[UVC_EVENT_DATA - V4L2_EVENT_PRIVATE_START] = handle_data_event
+EVENT_HANDLERS = tuple(EVENT_HANDLERS)
 
 if __name__ == "__main__":
-    main()
+    # Per-event/per-frame logging is DEBUG; set UVC_LOG_LEVEL=DEBUG to see it.
+    # Records go through a queue so the terminal write happens on the
+    # listener's thread, not before the event loop sends its response.
+    log_queue = queue.SimpleQueue()
+    # Set before the first thread starts: mlockall(MCL_FUTURE) locks and
+    # faults in every thread stack in full
+    threading.stack_size(THREAD_STACK_SIZE)
+    listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler())
+    logging.basicConfig(level=os.environ.get("UVC_LOG_LEVEL", "WARNING"),
+                        format="%(message)s",
+                        handlers=[logging.handlers.QueueHandler(log_queue)])
+    listener.start()
+    try:
+        main()
+    finally:
+        listener.stop()